@@ -1,26 +1,28 @@
-from dotenv import load_dotenv
-import os
+import logging
+from settings import DEBUG, WATSONX_API_KEY, WATSONX_URL, WATSONX_PROJECT_ID, USDA_API_KEY
 
-load_dotenv()  # load variables from .env
+logger = logging.getLogger(__name__)
 
-WATSONX_API_KEY = os.getenv("WATSONX_API_KEY")
-WATSONX_URL = os.getenv("WATSONX_URL")
-WATSONX_PROJECT_ID = os.getenv("WATSONX_PROJECT_ID")
-
-USDA_API_KEY = os.getenv("USDA_API_KEY")
-
-print(WATSONX_API_KEY, WATSONX_URL, WATSONX_PROJECT_ID)
-print(USDA_API_KEY)
+# Optional: verify keys are loaded, without printing their values
+# Only this module's logger is raised to DEBUG; a root-level DEBUG config
+# would make httpx log every request URL
+if DEBUG:
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.StreamHandler())
+    logger.debug("watsonx configured: %s", bool(WATSONX_API_KEY and WATSONX_URL and WATSONX_PROJECT_ID))
+    logger.debug("usda configured: %s", bool(USDA_API_KEY))
 
 
 
 
 # app.py
+import asyncio
 import gradio as gr
 from tools import (
-    extract_ingredients,
-    nutrition_lookup,
-    diabetic_impact,
+    aextract_ingredients,
+    normalize_ingredient,
+    anutrition_lookup,
+    adiabetic_impact_batch,
     meal_plan_generator,
     glucose_predictor,
     grocery_advisor,
@@ -31,21 +33,23 @@ from tools import (
 # -------------------------
 # 1. Food Analysis Function
 # -------------------------
-def analyze_food(image_or_url):
+async def analyze_food(image_or_url):
     # Step 1: Extract ingredients
-    ingredients = extract_ingredients(image_or_url)
+    ingredients = await aextract_ingredients(image_or_url)
     
-    # Step 2: Get nutrition facts for each ingredient
-    nutrition_data = []
-    for item in ingredients.split(","):
-        nutrition_data.append(nutrition_lookup(item.strip()))
+    # Step 2: Split and dedupe by normalized name, then fetch nutrition
+    # facts for each distinct ingredient concurrently
+    items = [item.strip() for item in ingredients.split(",") if item.strip()]
+    keys = [normalize_ingredient(item) for item in items]
+    unique_items = {}
+    for key, item in zip(keys, items):
+        unique_items.setdefault(key, item)
+    nutrition_data = await asyncio.gather(*map(anutrition_lookup, unique_items.values()))
     
-    # Step 3: Combine nutrition data and calculate diabetic impact
-    impact_results = []
-    for data in nutrition_data:
-        impact_results.append(diabetic_impact(data))
+    # Step 3: Calculate diabetic impact for all ingredients in one request
+    impact_by_item = dict(zip(unique_items, await adiabetic_impact_batch(nutrition_data)))
     
-    return "\n\n".join(impact_results)
+    return "\n\n".join(impact_by_item[key] for key in keys)
 
 # -------------------------
 # 2. Meal Planner Function
@@ -92,7 +96,7 @@ with gr.Blocks() as demo:
         img_input = gr.Textbox(label="Image URL or local path")
         food_output = gr.Textbox(label="Food Analysis Result")
         btn_food = gr.Button("Analyze Food")
-        btn_food.click(analyze_food, inputs=img_input, outputs=food_output)
+        btn_food.click(analyze_food, inputs=img_input, outputs=food_output, concurrency_limit=4)
     
     with gr.Tab("Meal Planner"):
         meal_pref = gr.Dropdown(["keto", "vegan", "vegetarian", "low-carb"], label="Meal Preference")
@@ -130,4 +134,4 @@ with gr.Blocks() as demo:
         btn_habit.click(analyze_habits, inputs=[meals, steps, sleep_hours], outputs=habit_output)
 
 # Launch app
-demo.launch()
+demo.queue(default_concurrency_limit=8, max_size=64).launch()
@@ -1,56 +1,69 @@
-from dotenv import load_dotenv
-import os
+import logging
+import re
+import asyncio
 import gradio as gr
 
-load_dotenv()  # Load environment variables from .env
+from settings import DEBUG, WATSONX_API_KEY, WATSONX_URL, WATSONX_PROJECT_ID, USDA_API_KEY
 
-# Optional: verify keys are loaded
-print(os.getenv("WATSONX_API_KEY"))
-print(os.getenv("WATSONX_URL"))
-print(os.getenv("WATSONX_PROJECT_ID"))
-print(os.getenv("USDA_API_KEY"))
+logger = logging.getLogger(__name__)
 
-from  tools import extract_ingredients,  nutrition_lookup, diabetic_impact, meal_plan_generator, glucose_predictor, grocery_advisor, exercise_recommender,  habit_analyzer
+# Optional: verify keys are loaded, without printing their values
+# Only this module's logger is raised to DEBUG; a root-level DEBUG config
+# would make httpx log every request URL
+if DEBUG:
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.StreamHandler())
+    logger.debug("watsonx configured: %s", bool(WATSONX_API_KEY and WATSONX_URL and WATSONX_PROJECT_ID))
+    logger.debug("usda configured: %s", bool(USDA_API_KEY))
+
+from  tools import aextract_ingredients,  normalize_ingredient, anutrition_lookup, adiabetic_impact_batch, meal_plan_generator, glucose_predictor, grocery_advisor, exercise_recommender,  habit_analyzer
 
 # -------------------------
 # 1. Food Analysis Function
 # -------------------------
 # app.py (or wherever analyze_food is defined)
-def analyze_food(image_or_url):
+# Leading "* ", "- ", "• ", "1. " or "1) " on ingredient lines; a digit
+# right after the marker means a decimal quantity ("1.5 cups"), not a list number
+_BULLET_RE = re.compile(r"^\s*(?:[*\-•]|\d+[.)](?!\d))\s*")
+
+async def _safe_nutrition_lookup(item):
+    try:
+        return await anutrition_lookup(item)
+    except Exception as e:
+        return f"USDA API error for '{item}': {str(e)}"
+
+async def analyze_food(image_or_url):
     # Step 1: Extract ingredients from image
-    ingredients_text = extract_ingredients(image_or_url)  # WatsonX returns a string
+    ingredients_text = await aextract_ingredients(image_or_url)  # WatsonX returns a string
 
     # Step 2: Clean and split ingredients into a list
-    # Remove bullets, extra characters, and split by lines
-    ingredients_list = []
-    for line in ingredients_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        # Remove leading bullets or numbering
-        if line.startswith("* "):
-            line = line[2:].strip()
-        elif line[0].isdigit() and line[1] in [".", ")"]:
-            line = line[2:].strip()
-        ingredients_list.append(line)
-
-    # Step 3: Lookup nutrition info for each ingredient
-    nutrition_data = []
-    for item in ingredients_list:
-        try:
-            result = nutrition_lookup(item)
-        except Exception as e:
-            result = f"USDA API error for '{item}': {str(e)}"
-        nutrition_data.append(result)
-
-    # Step 4: Analyze diabetic impact for each ingredient
-    impact_results = []
-    for data in nutrition_data:
-        try:
-            impact = diabetic_impact(data)
-        except Exception as e:
-            impact = f"Error analyzing impact for '{data}': {str(e)}"
-        impact_results.append(impact)
+    # Remove leading bullets or numbering, skip lines left empty
+    ingredients_list = [
+        item
+        for item in (_BULLET_RE.sub("", line).strip() for line in ingredients_text.splitlines())
+        if item
+    ]
+
+    # Step 3: Lookup nutrition info for each distinct ingredient concurrently
+    normalized = [normalize_ingredient(item) for item in ingredients_list]
+    unique_items = {}
+    for key, item in zip(normalized, ingredients_list):
+        unique_items.setdefault(key, item)
+    unique_nutrition = await asyncio.gather(
+        *(_safe_nutrition_lookup(item) for item in unique_items.values())
+    )
+
+    # Step 4: Analyze diabetic impact for all ingredients in one request
+    try:
+        unique_impact = await adiabetic_impact_batch(unique_nutrition)
+    except Exception as e:
+        unique_impact = [f"Error analyzing impact for '{data}': {str(e)}" for data in unique_nutrition]
+
+    # Re-expand results to the original ingredient order
+    nutrition_by_item = dict(zip(unique_items, unique_nutrition))
+    impact_by_item = dict(zip(unique_items, unique_impact))
+    nutrition_data = [nutrition_by_item[item] for item in normalized]
+    impact_results = [impact_by_item[item] for item in normalized]
 
     return {
         "ingredients": ingredients_list,
@@ -106,15 +119,15 @@ with gr.Blocks() as demo:
      food_output = gr.Textbox(label="Food Analysis Result")
      btn_food = gr.Button("Analyze Food")
 
-    def handle_food_input(file, url):
+    async def handle_food_input(file, url):
         if file:  # If user uploaded a file
-            return analyze_food(file.name)
+            return await analyze_food(file.name)
         elif url:  # If user provided a URL
-            return analyze_food(url)
+            return await analyze_food(url)
         else:
             return "Please upload a file or provide a URL."
 
-    btn_food.click(handle_food_input, inputs=[img_file, img_url], outputs=food_output)
+    btn_food.click(handle_food_input, inputs=[img_file, img_url], outputs=food_output, concurrency_limit=4)
     
     with gr.Tab("Meal Planner"):
         meal_pref = gr.Dropdown(["keto", "vegan", "vegetarian", "low-carb"], label="Meal Preference")
@@ -152,4 +165,4 @@ with gr.Blocks() as demo:
         btn_habit.click(analyze_habits, inputs=[meals, steps, sleep_hours], outputs=habit_output)
 
 # Launch app
-demo.launch()
+demo.queue(default_concurrency_limit=8, max_size=64).launch()
@@ -0,0 +1,20 @@
+# settings.py
+import os
+from dotenv import load_dotenv
+
+# ------------------------------
+# Load environment variables (once per process)
+# ------------------------------
+load_dotenv()
+
+WATSONX_API_KEY = os.getenv("WATSONX_API_KEY")
+WATSONX_URL = os.getenv("WATSONX_URL")
+WATSONX_PROJECT_ID = os.getenv("WATSONX_PROJECT_ID")
+WATSONX_CREDS = {
+    "apikey": WATSONX_API_KEY,
+    "url": WATSONX_URL
+}
+
+USDA_API_KEY = os.getenv("USDA_API_KEY")
+
+DEBUG = bool(os.getenv("DEBUG"))
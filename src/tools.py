@@ -1,56 +1,155 @@
 # tools.py
 import os
+import asyncio
 import base64
-import requests
+import difflib
+import functools
+import hashlib
+import json
+import operator
+import re
+import string
+import time
+import httpx
 from io import BytesIO
 import random
-from dotenv import load_dotenv
+from diskcache import Cache
 from langchain.tools import tool
-from ibm_watsonx_ai.foundation_models import ModelInference
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
-# ------------------------------
-# Load environment variables
-# ------------------------------
-load_dotenv()
+from settings import WATSONX_CREDS, WATSONX_PROJECT_ID, USDA_API_KEY
 
-WATSONX_PROJECT_ID = os.getenv("WATSONX_PROJECT_ID")
-WATSONX_CREDS = {
-    "apikey": os.getenv("WATSONX_API_KEY"),
-    "url": os.getenv("WATSONX_URL")
-}
+USDA_SEARCH_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
+# Sent as a header so the key stays out of request URLs, logs and errors
+_USDA_HEADERS = {"X-Api-Key": USDA_API_KEY or ""}
+
+# Shared HTTP clients so lookups reuse pooled keep-alive connections.
+# The transports retry failed connection attempts; HTTP-level retries
+# for USDA are handled by _usda_retry below.
+_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+_SESSION = httpx.Client(
+    timeout=_TIMEOUT,
+    transport=httpx.HTTPTransport(http2=True, retries=3, limits=_LIMITS),
+)
+_ASYNC_CLIENT = httpx.AsyncClient(
+    timeout=_TIMEOUT,
+    transport=httpx.AsyncHTTPTransport(http2=True, retries=3, limits=_LIMITS),
+)
+
+# Persistent cache for USDA nutrition data and LLM impact analyses
+_CACHE = Cache("/tmp/usda_cache")
+_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days
+
+# Shared WatsonX clients, built on first use: building one per call
+# re-authenticates and discards the SDK's HTTP connection pool, and
+# importing ibm_watsonx_ai lazily keeps module import fast
+@functools.lru_cache(maxsize=None)
+def _vision_model():
+    from ibm_watsonx_ai.foundation_models import ModelInference
+
+    return ModelInference(
+        model_id="meta-llama/llama-3-2-90b-vision-instruct",
+        credentials=WATSONX_CREDS,
+        project_id=WATSONX_PROJECT_ID,
+        params={"max_tokens": 400},
+    )
+
+@functools.lru_cache(maxsize=None)
+def _granite_model():
+    from ibm_watsonx_ai.foundation_models import ModelInference
+
+    return ModelInference(
+        model_id="ibm/granite-3-3-8b-instruct",
+        credentials=WATSONX_CREDS,
+        project_id=WATSONX_PROJECT_ID,
+        params={"max_tokens": 300},
+    )
 
-USDA_API_KEY = os.getenv("USDA_API_KEY")
+# Cap concurrent WatsonX calls to avoid rate-limit bursts
+_WATSONX_LIMIT = asyncio.Semaphore(5)
 
 # ------------------------------
 # 1. IMAGE → INGREDIENT EXTRACTOR
 # ------------------------------
-@tool("extract_ingredients", return_direct=False)
-def extract_ingredients(image_input: str) -> str:
+# Larger images are downscaled before upload to cut payload and vision latency
+_MAX_IMAGE_SIDE = 1024
+# Remote images above this size are rejected while downloading
+_MAX_IMAGE_BYTES = 15 * 1024 * 1024
+
+def _download_image(url: str) -> bytes:
+    chunks = []
+    size = 0
+    with _SESSION.stream("GET", url, follow_redirects=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes(chunk_size=65536):
+            size += len(chunk)
+            if size > _MAX_IMAGE_BYTES:
+                raise ValueError(f"Image at {url} exceeds {_MAX_IMAGE_BYTES // (1024 * 1024)} MB limit")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+async def _adownload_image(url: str) -> bytes:
+    chunks = []
+    size = 0
+    async with _ASYNC_CLIENT.stream("GET", url, follow_redirects=True) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(chunk_size=65536):
+            size += len(chunk)
+            if size > _MAX_IMAGE_BYTES:
+                raise ValueError(f"Image at {url} exceeds {_MAX_IMAGE_BYTES // (1024 * 1024)} MB limit")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+def _encode_image(raw: bytes) -> str:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(BytesIO(raw))
+    except (UnidentifiedImageError, OSError):
+        # Let the vision model judge formats Pillow cannot decode
+        return base64.b64encode(raw).decode("ascii")
+
+    if max(image.size) > _MAX_IMAGE_SIDE:
+        # Apply the EXIF orientation, since re-saving drops the tag
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE))
+        if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+            # Flatten transparency onto white rather than JPEG's implicit black
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        buffer = BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=90)
+        raw = buffer.getvalue()
+    return base64.b64encode(raw).decode("ascii")
+
+def prepare_image(image_input: str) -> str:
     """
-    Extracts ingredients from a food image using WatsonX LLaMA Vision model.
-    Accepts: Local file path or URL.
-    Returns: A text list of ingredients.
+    Loads a local file or URL and returns the base64 payload for the vision model.
     """
     if image_input.startswith("http"):
-        response = requests.get(image_input)
-        response.raise_for_status()
-        image_bytes = BytesIO(response.content)
+        raw = _download_image(image_input)
     else:
         if not os.path.isfile(image_input):
             raise FileNotFoundError(f"No file found at: {image_input}")
         with open(image_input, "rb") as f:
-            image_bytes = BytesIO(f.read())
+            raw = f.read()
 
-    encoded_image = base64.b64encode(image_bytes.read()).decode("utf-8")
+    return _encode_image(raw)
 
-    model = ModelInference(
-        model_id="meta-llama/llama-3-2-90b-vision-instruct",
-        credentials=WATSONX_CREDS,
-        project_id=WATSONX_PROJECT_ID,
-        params={"max_tokens": 400},
-    )
+async def aprepare_image(image_input: str) -> str:
+    """
+    Async variant of prepare_image. URLs are downloaded with the async
+    client; file reads and Pillow/base64 work run in a worker thread.
+    """
+    if image_input.startswith("http"):
+        raw = await _adownload_image(image_input)
+        return await asyncio.to_thread(_encode_image, raw)
+    return await asyncio.to_thread(prepare_image, image_input)
 
-    response = model.chat(
+def _extract_ingredients(encoded_image: str) -> str:
+    response = _vision_model().chat(
         messages=[
             {
                 "role": "user",
@@ -64,43 +163,211 @@ def extract_ingredients(image_input: str) -> str:
 
     return response["choices"][0]["message"]["content"]
 
+@tool("extract_ingredients", return_direct=False)
+def extract_ingredients(image_input: str) -> str:
+    """
+    Extracts ingredients from a food image using WatsonX LLaMA Vision model.
+    Accepts: Local file path or URL.
+    Returns: A text list of ingredients.
+    """
+    return _extract_ingredients(prepare_image(image_input))
+
+async def aextract_ingredients(image_input: str) -> str:
+    """
+    Async variant of extract_ingredients.
+    """
+    encoded_image = await aprepare_image(image_input)
+    async with _WATSONX_LIMIT:
+        return await asyncio.to_thread(_extract_ingredients, encoded_image)
+
 # ------------------------------
 # 2. NUTRITION API (USDA)
 # ------------------------------
-@tool("nutrition_lookup", return_direct=False)
-def nutrition_lookup(food_name: str) -> str:
+# Leading quantities like "2 ", "1/2 cup ", "1.5 tbsp ", "3-4 " or "200g " in ingredient names
+_QUANTITY_RE = re.compile(r"^\d+(?:[./-]\d+)?\s*(?:g|ml|cups?|tbsp|tsp)?\b\s*", re.IGNORECASE)
+
+def _clean_ingredient(name: str) -> str:
+    return _QUANTITY_RE.sub("", name.strip().lower()).strip()
+
+def normalize_ingredient(name: str) -> str:
     """
-    Uses USDA FoodData Central API to retrieve nutrition facts:
-    - calories, carbs, sugar, protein, fat, fiber
+    Returns the key used to dedupe and cache ingredients: lowercased,
+    leading quantity stripped and a trailing plural 's' removed, so
+    "2 Eggs", "eggs" and "egg" are looked up once.
     """
-    search_url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-    params = {"api_key": USDA_API_KEY, "query": food_name, "pageSize": 1}
+    key = _clean_ingredient(name)
+    if key.endswith("s") and not key.endswith("ss"):
+        key = key[:-1]
+    return key
 
-    search_response = requests.get(search_url, params=params)
-    search_response.raise_for_status()
-    search_data = search_response.json()
+# USDA nutrient names → result keys; every other nutrient is skipped
+_WANTED = {
+    "Energy": "calories",
+    "Carbohydrate, by difference": "carbs",
+    "Sugars, total including NLEA": "sugar",
+    "Total lipid (fat)": "fat",
+    "Protein": "protein",
+    "Fiber, total dietary": "fiber"
+}
 
+def _parse_usda(search_data: dict):
     if not search_data.get("foods"):
-        return f"No USDA data found for '{food_name}'."
+        return None
 
     food = search_data["foods"][0]
-    nutrients = {n["nutrientName"]: n.get("value", 0) for n in food.get("foodNutrients", [])}
+    result = {"food": food.get("description")}
+    for n in food.get("foodNutrients", []):
+        key = _WANTED.get(n["nutrientName"])
+        if key:
+            result[key] = n.get("value", 0)
+
+    return result
+
+def _format_nutrition(food_name: str, result) -> str:
+    if result is None:
+        return f"No USDA data found for '{food_name}'."
+    # Compact JSON without zero/missing values keeps the LLM prompt short
+    return json.dumps({k: v for k, v in result.items() if v}, separators=(",", ":"))
+
+# Transient USDA failures (rate limiting, 5xx, timeouts) are retried with
+# jittered exponential backoff, honouring Retry-After when USDA sends one
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_MAX_RETRY_AFTER = 10
+_backoff = wait_exponential_jitter(initial=0.2, max=2)
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+def _usda_wait(retry_state) -> float:
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), _MAX_RETRY_AFTER)
+    return _backoff(retry_state)
+
+_usda_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=_usda_wait,
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+
+@_usda_retry
+def _search_usda(query: str) -> dict:
+    params = {"query": query, "pageSize": 1}
+
+    search_response = _SESSION.get(USDA_SEARCH_URL, params=params, headers=_USDA_HEADERS)
+    search_response.raise_for_status()
+    return search_response.json()
+
+@_usda_retry
+async def _asearch_usda(query: str) -> dict:
+    params = {"query": query, "pageSize": 1}
+
+    search_response = await _ASYNC_CLIENT.get(USDA_SEARCH_URL, params=params, headers=_USDA_HEADERS)
+    search_response.raise_for_status()
+    return search_response.json()
+
+# In-process copies are re-read from disk at least this often, so the
+# disk cache's 30-day TTL also applies to long-running processes
+_MEMO_WINDOW = 60 * 60  # 1 hour
+
+@functools.lru_cache(maxsize=4096)
+def _memo_food(key: str, window: int) -> dict:
+    # In-process mirror of the disk cache. Misses raise so that lru_cache
+    # does not remember them and a later stored result is still picked up.
+    result = _CACHE.get(("usda", key))
+    if result is None:
+        raise KeyError(key)
+    return result
+
+def _stored_food(key: str) -> dict:
+    return _memo_food(key, int(time.time() // _MEMO_WINDOW))
+
+def _store_food(key: str, result) -> None:
+    if result is not None:
+        _CACHE.set(("usda", key), result, expire=_CACHE_TTL)
+
+def _usda_food(food_name: str):
+    key = normalize_ingredient(food_name)
+    try:
+        return _stored_food(key)
+    except KeyError:
+        pass
 
-    result = {
-        "food": food.get("description"),
-        "calories": nutrients.get("Energy", 0),
-        "carbs": nutrients.get("Carbohydrate, by difference", 0),
-        "sugar": nutrients.get("Sugars, total including NLEA", 0),
-        "fat": nutrients.get("Total lipid (fat)", 0),
-        "protein": nutrients.get("Protein", 0),
-        "fiber": nutrients.get("Fiber, total dietary", 0)
-    }
+    # Only the cache key is singularized; USDA gets the name as written
+    result = _parse_usda(_search_usda(_clean_ingredient(food_name)))
+    _store_food(key, result)
+    return result
 
-    return str(result)
+@tool("nutrition_lookup", return_direct=False)
+def nutrition_lookup(food_name: str) -> str:
+    """
+    Uses USDA FoodData Central API to retrieve nutrition facts:
+    - calories, carbs, sugar, protein, fat, fiber
+    """
+    return _format_nutrition(food_name, _usda_food(food_name))
+
+async def anutrition_lookup(food_name: str) -> str:
+    """
+    Async variant of nutrition_lookup using the shared httpx client.
+    Cache reads and writes (SQLite) run in a worker thread.
+    """
+    key = normalize_ingredient(food_name)
+    try:
+        result = await asyncio.to_thread(_stored_food, key)
+    except KeyError:
+        result = _parse_usda(await _asearch_usda(_clean_ingredient(food_name)))
+        await asyncio.to_thread(_store_food, key, result)
+    return _format_nutrition(food_name, result)
 
 # ------------------------------
 # 3. DIABETIC IMPACT ANALYZER
 # ------------------------------
+# Prompts keep all instructions in a constant prefix and put the variable
+# nutrition data last, so WatsonX can reuse its cached prefix across calls
+_IMPACT_PREFIX = """Analyze the JSON nutrition data below and estimate diabetic impact.
+
+Provide:
+- Summary (carbs & sugar impact)
+- Estimated glycemic load category (low/medium/high)
+- Blood sugar impact
+- Safe serving size
+- Advice for diabetic individuals
+---
+JSON nutrition below:
+"""
+_IMPACT_SUFFIX = "\n---\n"
+
+_IMPACT_BATCH_PREFIX = """Analyze each numbered JSON nutrition entry below and estimate its diabetic impact.
+
+Respond ONLY with a JSON array holding one object per entry, in this form:
+[{"idx": 0, "summary": "carbs & sugar impact", "gl": "low|medium|high", "blood_sugar_impact": "...", "serving_size": "...", "advice": "advice for diabetic individuals"}]
+---
+JSON nutrition below:
+"""
+
+def _impact_key(nutrition_json: str, style: str) -> tuple:
+    # Single analyses are free-form text and batch ones use _format_impact,
+    # so each style is cached separately to keep output consistent
+    return ("impact", style, hashlib.sha256(nutrition_json.encode("utf-8")).hexdigest())
+
+def _diabetic_impact(nutrition_json: str) -> str:
+    key = _impact_key(nutrition_json, "single")
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    prompt = _IMPACT_PREFIX + nutrition_json + _IMPACT_SUFFIX
+
+    response = _granite_model().chat(messages=[{"role": "user", "content": prompt}])
+    impact = response["choices"][0]["message"]["content"]
+    _CACHE.set(key, impact, expire=_CACHE_TTL)
+    return impact
+
 @tool("diabetic_impact", return_direct=False)
 def diabetic_impact(nutrition_json: str) -> str:
     """
@@ -109,55 +376,129 @@ def diabetic_impact(nutrition_json: str) -> str:
     - recommended portion size
     - advice for diabetics
     """
-    prompt = f"""
-Analyze the following nutrition data and estimate diabetic impact.
+    return _diabetic_impact(nutrition_json)
 
-Nutrition Data:
-{nutrition_json}
+# WatsonX error messages that mean the prompt did not fit the model context
+_CONTEXT_ERROR_RE = re.compile(r"context length|context window|maximum.*tokens|too many tokens", re.IGNORECASE)
 
-Provide:
-- Summary (carbs & sugar impact)
-- Estimated glycemic load category (low/medium/high)
-- Blood sugar impact
-- Safe serving size
-- Advice for diabetic individuals
-"""
+# Batch entries missing any of these are re-analyzed individually
+_REQUIRED_IMPACT_FIELDS = ("summary", "gl", "advice")
 
-    model = ModelInference(
-        model_id="ibm/granite-3-3-8b-instruct",
-        credentials=WATSONX_CREDS,
-        project_id=WATSONX_PROJECT_ID,
-        params={"max_tokens": 300},
+def _format_impact(entry: dict):
+    if not all(entry.get(field) for field in _REQUIRED_IMPACT_FIELDS):
+        return None
+    return (
+        f"Summary: {entry.get('summary', '')}\n"
+        f"Glycemic load: {entry.get('gl', '')}\n"
+        f"Blood sugar impact: {entry.get('blood_sugar_impact', '')}\n"
+        f"Safe serving size: {entry.get('serving_size', '')}\n"
+        f"Advice: {entry.get('advice', '')}"
     )
 
-    response = model.chat(messages=[{"role": "user", "content": prompt}])
-    return response["choices"][0]["message"]["content"]
+def _diabetic_impact_chunk(nutrition_list: list) -> list:
+    entries = "\n".join(f"{i}. {data}" for i, data in enumerate(nutrition_list))
+    prompt = _IMPACT_BATCH_PREFIX + entries + _IMPACT_SUFFIX
+
+    response = _granite_model().chat(
+        messages=[{"role": "user", "content": prompt}],
+        params={"max_tokens": 300 * len(nutrition_list)},
+    )
+    content = response["choices"][0]["message"]["content"]
+
+    match = re.search(r"\[.*\]", content, re.DOTALL)
+    try:
+        parsed = json.loads(match.group(0)) if match else []
+    except json.JSONDecodeError:
+        parsed = []
+    entries = [entry for entry in parsed if isinstance(entry, dict)] if isinstance(parsed, list) else []
+
+    by_idx = {}
+    for entry in entries:
+        try:
+            by_idx[int(entry.get("idx"))] = _format_impact(entry)
+        except (TypeError, ValueError):
+            continue
+    impacts = [by_idx.get(i) for i in range(len(nutrition_list))]
+
+    # Bad or 1-based idx values: trust list position if the count matches
+    if None in impacts and len(entries) == len(nutrition_list):
+        impacts = [_format_impact(entry) for entry in entries]
+    return impacts
+
+def _diabetic_impact_batch(nutrition_list: list) -> list:
+    results = []
+    batch_size = max(len(nutrition_list), 1)
+    start = 0
+    while start < len(nutrition_list):
+        chunk = nutrition_list[start:start + batch_size]
+        try:
+            results.extend(_diabetic_impact_chunk(chunk))
+        except Exception as e:
+            if batch_size == 1 or not _CONTEXT_ERROR_RE.search(str(e)):
+                raise
+            batch_size = max(int(batch_size * 0.9), 1)
+            continue
+        start += len(chunk)
+    return results
+
+def diabetic_impact_batch(nutrition_list: list) -> list:
+    """
+    Evaluates the diabetic impact of several foods with one WatsonX request
+    per batch instead of one per food. If the prompt exceeds the model
+    context, the batch size shrinks by 10% and the remainder is retried.
+    Previously analyzed nutrition data is served from the cache, and
+    entries the batch response did not cover are analyzed one by one.
+    Returns one analysis string per input, in input order.
+    """
+    keys = [_impact_key(data, "batch") for data in nutrition_list]
+    results = [_CACHE.get(key) for key in keys]
+    missing = [i for i, impact in enumerate(results) if impact is None]
+
+    fresh = _diabetic_impact_batch([nutrition_list[i] for i in missing]) if missing else []
+    for i, impact in zip(missing, fresh):
+        if impact is None:
+            results[i] = _diabetic_impact(nutrition_list[i])
+        else:
+            _CACHE.set(keys[i], impact, expire=_CACHE_TTL)
+            results[i] = impact
+    return results
+
+async def adiabetic_impact_batch(nutrition_list: list) -> list:
+    """
+    Async variant of diabetic_impact_batch.
+    """
+    async with _WATSONX_LIMIT:
+        return await asyncio.to_thread(diabetic_impact_batch, nutrition_list)
 
 # ------------------------------
 # 4. MEAL PLANNER
 # ------------------------------
-@tool("meal_plan_generator", return_direct=True)
-def meal_plan_generator(preferences: str) -> str:
-    """
-    Generates a weekly diabetic-friendly meal plan.
-    preferences: "keto", "vegan", "vegetarian", "low-carb"
-    """
-    sample_meals = {
-        "keto": ["Egg & spinach scramble", "Grilled chicken salad", "Zucchini noodles with pesto", "Almonds & cheese snack"],
-        "vegan": ["Oatmeal with berries", "Chickpea salad", "Tofu stir-fry", "Hummus & veggies"],
-        "vegetarian": ["Greek yogurt with fruits", "Veggie wrap", "Paneer curry with salad", "Nuts & seeds"],
-        "low-carb": ["Avocado egg salad", "Grilled salmon with broccoli", "Cauliflower rice stir-fry", "Cheese & cucumber slices"]
-    }
+_SAMPLE_MEALS = {
+    "keto": ["Egg & spinach scramble", "Grilled chicken salad", "Zucchini noodles with pesto", "Almonds & cheese snack"],
+    "vegan": ["Oatmeal with berries", "Chickpea salad", "Tofu stir-fry", "Hummus & veggies"],
+    "vegetarian": ["Greek yogurt with fruits", "Veggie wrap", "Paneer curry with salad", "Nuts & seeds"],
+    "low-carb": ["Avocado egg salad", "Grilled salmon with broccoli", "Cauliflower rice stir-fry", "Cheese & cucumber slices"]
+}
 
-    meals = sample_meals.get(preferences.lower(), sample_meals["low-carb"])
-    plan = f"""
-Weekly Meal Plan ({preferences}):
+# Plans are fixed per preference, so format each one once at import
+_MEAL_CACHE = {
+    preference: f"""
+Weekly Meal Plan ({preference}):
 - Breakfast: {meals[0]}
 - Lunch: {meals[1]}
 - Dinner: {meals[2]}
 - Snack: {meals[3]}
 """
-    return plan
+    for preference, meals in _SAMPLE_MEALS.items()
+}
+
+@tool("meal_plan_generator", return_direct=True)
+def meal_plan_generator(preferences: str) -> str:
+    """
+    Generates a weekly diabetic-friendly meal plan.
+    preferences: "keto", "vegan", "vegetarian", "low-carb"
+    """
+    return _MEAL_CACHE.get(preferences.lower(), _MEAL_CACHE["low-carb"])
 
 # ------------------------------
 # 5. GLUCOSE PREDICTOR
@@ -174,68 +515,86 @@ def glucose_predictor(carbs: float, previous_glucose: float = 100, time_since_la
 # ------------------------------
 # 6. GROCERY ADVISOR
 # ------------------------------
+_ALTERNATIVES = {
+    "bread": "whole grain or almond flour bread",
+    "rice": "cauliflower rice",
+    "soda": "sparkling water with lemon",
+    "pasta": "zucchini noodles or shirataki noodles",
+    "sugar": "stevia or monk fruit sweetener"
+}
+_PUNCT = str.maketrans("", "", string.punctuation)
+
+def _match_alternative(item: str):
+    # Try the exact item, then its singular, then a close spelling
+    item = item.translate(_PUNCT).strip().lower()
+    singular = item[:-1] if item.endswith("s") else item
+    for candidate in (item, singular):
+        if candidate in _ALTERNATIVES:
+            return _ALTERNATIVES[candidate]
+    close = difflib.get_close_matches(singular, _ALTERNATIVES, n=1, cutoff=0.85)
+    return _ALTERNATIVES[close[0]] if close else None
+
 @tool("grocery_advisor", return_direct=True)
 def grocery_advisor(items: str) -> str:
     """
     Suggests diabetic-friendly alternatives for grocery items.
     Input: comma-separated items string
     """
-    item_list = [item.strip().lower() for item in items.split(",")]
-    alternatives = {
-        "bread": "whole grain or almond flour bread",
-        "rice": "cauliflower rice",
-        "soda": "sparkling water with lemon",
-        "pasta": "zucchini noodles or shirataki noodles",
-        "sugar": "stevia or monk fruit sweetener"
-    }
-
-    suggestions = []
-    for item in item_list:
-        if item in alternatives:
-            suggestions.append(f"{item} → {alternatives[item]}")
-        else:
-            suggestions.append(f"{item} → No alternative needed")
+    item_list = [item.strip() for item in items.split(",")]
+    suggestions = [
+        f"{item} → {_match_alternative(item) or 'No alternative needed'}"
+        for item in item_list
+    ]
 
     return "Grocery Recommendations:\n" + "\n".join(suggestions)
 
 # ------------------------------
 # 7. EXERCISE RECOMMENDER
 # ------------------------------
+_GLUCOSE_ALERTS = (
+    (operator.lt, 70, "Glucose is low! Recommend light activity: 10-15 min walking and have a small snack first."),
+    (operator.gt, 180, "Glucose is high! Avoid intense exercise. Recommend gentle stretching or short walk."),
+)
+_DURATIONS = (20, 25, 30)
+_INTENSITY = {"moderate": "moderate"}
+
 @tool("exercise_recommender", return_direct=True)
 def exercise_recommender(current_glucose: float, fitness_level: str = "moderate") -> str:
     """
     Recommends safe exercise based on current glucose level and fitness.
     """
-    if current_glucose < 70:
-        return "Glucose is low! Recommend light activity: 10-15 min walking and have a small snack first."
-    elif current_glucose > 180:
-        return "Glucose is high! Avoid intense exercise. Recommend gentle stretching or short walk."
-    else:
-        intensity = "moderate" if fitness_level == "moderate" else "light"
-        duration = random.choice([20, 25, 30])
-        return f"Glucose safe. Recommend {intensity} exercise for {duration} minutes."
+    for compare, threshold, message in _GLUCOSE_ALERTS:
+        if compare(current_glucose, threshold):
+            return message
+
+    intensity = _INTENSITY.get(fitness_level, "light")
+    duration = _DURATIONS[random.randrange(len(_DURATIONS))]
+    return f"Glucose safe. Recommend {intensity} exercise for {duration} minutes."
 
 # ------------------------------
 # 8. HABIT ANALYZER
 # ------------------------------
+# (log key, comparison, threshold, insight when true, insight when false)
+_HABIT_RULES = (
+    ("steps", operator.lt, 7000,
+     "Try to increase daily steps to at least 7000 for better glucose control.",
+     "Great job on staying active!"),
+    ("sleep_hours", operator.lt, 7,
+     "Increase sleep to 7-8 hours for optimal health.",
+     "Sleep duration is good."),
+    ("meals", operator.gt, 4,
+     "Consider reducing snacking to avoid glucose spikes.",
+     None),
+)
+
 @tool("habit_analyzer", return_direct=True)
 def habit_analyzer(logs: dict) -> str:
     """
     Analyzes daily habits (meals, sleep, steps) and provides weekly insights for glucose control.
     """
-    insights = []
-
-    if logs.get("steps", 0) < 7000:
-        insights.append("Try to increase daily steps to at least 7000 for better glucose control.")
-    else:
-        insights.append("Great job on staying active!")
-
-    if logs.get("sleep_hours", 0) < 7:
-        insights.append("Increase sleep to 7-8 hours for optimal health.")
-    else:
-        insights.append("Sleep duration is good.")
-
-    if logs.get("meals", 0) > 4:
-        insights.append("Consider reducing snacking to avoid glucose spikes.")
+    insights = [
+        when_true if compare(logs.get(key, 0), threshold) else when_false
+        for key, compare, threshold, when_true, when_false in _HABIT_RULES
+    ]
 
-    return "Weekly Habit Insights:\n" + "\n".join(insights)
+    return "Weekly Habit Insights:\n" + "\n".join(i for i in insights if i)